@@ -5,15 +5,30 @@ Uses Serper.dev API to access real Google Shopping results
 """
 
 import os
+import signal
+import logging
+from logging.handlers import QueueHandler, QueueListener
 import time
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
 from datetime import datetime
+from dataclasses import dataclass, field, replace
 import re
 import csv
+import heapq
+import hashlib
+import operator
+import functools
+import math
 from io import StringIO
-from threading import Thread
-from flask import Flask, render_template_string, jsonify
+from threading import Thread, Lock
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+from waitress import serve
 
 # Configuration
 DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL', '')
@@ -21,10 +36,36 @@ GOOGLE_SHEET_URL = os.getenv('GOOGLE_SHEET_URL', '')
 SERPER_API_KEY = os.getenv('SERPER_API_KEY', '')
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '1800'))
 PORT = int(os.getenv('PORT', '10000'))
+SERPER_CONCURRENCY = int(os.getenv('SERPER_CONCURRENCY', '8'))
+# Serper searches per second; 0 or less disables the limit
+SERPER_RATE_LIMIT = float(os.getenv('SERPER_RATE_LIMIT', '5'))
+# Point this at a persistent disk for baselines to survive redeploys; the
+# default lives in the container's working directory
+PRICE_HISTORY_PATH = os.getenv('PRICE_HISTORY_PATH', 'price_history.json')
+LOG_LEVEL = os.getenv('LOGLEVEL', 'INFO').upper()
+
+logger = logging.getLogger('price_monitor')
+
+# Discord accepts at most this many embeds per webhook message
+DISCORD_MAX_EMBEDS = 10
+DISCORD_USERNAME = "Price Monitor"
+
+# Static parts of every alert embed; build_alert_embed fills in the rest
+_EMBED_BASE = {"footer": {"text": "Google Shopping Monitor"}}
+_ALERT_COLORS = {'range': 0x00ff00, 'drop': 0xff9900}
 
 # Excluded retailers
 EXCLUDED_RETAILERS = ['shein', 'amazon', 'ebay']
 
+# Precompiled patterns
+_SHEET_ID_RE = re.compile(r'/spreadsheets/d/([a-zA-Z0-9-_]+)')
+_GID_RE = re.compile(r'[#&]gid=([0-9]+)')
+_PRICE_RE = re.compile(r'\d[\d.,]*')
+_EXCLUDED_RE = re.compile('|'.join(map(re.escape, EXCLUDED_RETAILERS)), re.IGNORECASE)
+
+_price_key = operator.itemgetter('price')
+_ACTIVE_VALUES = frozenset({'TRUE', 'YES', '1', 'Y'})
+
 # Global status
 monitor_status = {
     'running': False,
@@ -35,25 +76,221 @@ monitor_status = {
     'alerts_sent': 0,
     'last_error': None,
     'startup_time': datetime.now().isoformat(),
-    'last_results': [],
+    'last_results': (),
     'api_calls_used': 0
 }
 
+_status_lock = Lock()
+
+def _update_status(**fields):
+    """Set monitor_status fields under the lock shared with dashboard reads"""
+    with _status_lock:
+        monitor_status.update(fields)
+
+def _increment_status(field, amount=1):
+    """Increment a monitor_status counter without losing concurrent updates"""
+    with _status_lock:
+        monitor_status[field] += amount
+
+def _status_snapshot():
+    """Return a consistent copy of monitor_status for rendering"""
+    with _status_lock:
+        return dict(monitor_status)
+
+@dataclass(slots=True)
+class Product:
+    """An active row from the products sheet plus its alert state"""
+    name: str
+    search_query: str
+    specifications: str
+    price_min: float
+    price_max: float
+    drop_threshold: float
+    full_query: str = field(init=False)
+    key: str = field(init=False)
+    lowest_price: float = math.inf
+    last_alert_type: str = ''
+    
+    def __post_init__(self):
+        # Build full search query
+        query = self.search_query or self.name
+        if self.specifications:
+            query += ' ' + self.specifications
+        self.full_query = query
+        self.key = self.name.lower()
+
+def _cell(row, index):
+    """Return the stripped CSV cell at index, or '' if the column or cell is missing"""
+    if index is None or index >= len(row):
+        return ''
+    return row[index].strip()
+
+def _parse_price(text):
+    """Parse a price like '£1,299.00' or '1.299,50 €', or return None"""
+    match = _PRICE_RE.search(text)
+    if not match:
+        return None
+    value = match.group().rstrip('.,')
+    
+    # The right-most separator is the decimal mark when both appear
+    last_point = value.rfind('.')
+    last_comma = value.rfind(',')
+    if last_point >= 0 and last_comma >= 0:
+        if last_comma > last_point:
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    elif last_comma >= 0:
+        # Only commas: a thousands separator when repeated or followed by
+        # exactly three digits ('1,299', '1,234,567'), else a decimal
+        # comma ('45,99')
+        if value.count(',') > 1 or len(value) - last_comma == 4:
+            value = value.replace(',', '')
+        else:
+            value = value.replace(',', '.')
+    elif last_point >= 0:
+        # Only points: repeated points are thousands separators
+        # ('1.234.567'). A single point followed by exactly three digits
+        # ('12.345') could be 12.345 or 12345, so skip it rather than risk
+        # being off by a factor of 1000.
+        if value.count('.') > 1:
+            value = value.replace('.', '')
+        elif len(value) - last_point == 4:
+            logger.debug("Skipping ambiguous price: %s", text)
+            return None
+    try:
+        price = float(value)
+    except ValueError:
+        return None
+    # '£0.00' shows up on contract and upfront listings; it is not a price
+    return price if price > 0 else None
+
+def _float_or(value, default):
+    """Parse a stripped CSV number, returning default for an empty cell"""
+    return float(value) if value else default
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per second (unlimited if rate <= 0)"""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 class PriceMonitor:
     def __init__(self):
         self.webhook_url = DISCORD_WEBHOOK_URL
         self.sheet_url = GOOGLE_SHEET_URL
         self.serper_key = SERPER_API_KEY
-        self.price_history = {}
+        self.history_path = PRICE_HISTORY_PATH
+        self.price_history = self._load_price_history()
+        self._history_dirty = False
+        self.session = self._create_session()
+        self.serper_limiter = RateLimiter(SERPER_RATE_LIMIT)
+        self._sheet_cache = {'etag': None, 'last_modified': None, 'digest': None, 'products': None}
+        self._serper_headers = {
+            'X-API-KEY': self.serper_key,
+            'Content-Type': 'application/json'
+        }
+    
+    def _create_session(self):
+        """Create a pooled HTTP session shared by all outbound calls"""
+        session = requests.Session()
+        # Keep at least one pooled connection per search worker so
+        # concurrent Serper calls never open throwaway connections
+        pool_maxsize = max(16, SERPER_CONCURRENCY)
+        
+        # The sheet export is a plain GET, safe to retry on server errors
+        get_retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=get_retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        # Serper and Discord POSTs are only retried when rejected with 429
+        # (after Retry-After). A 5xx or read timeout may mean the request
+        # went through, and resending would bill a search twice or post a
+        # duplicate alert.
+        post_retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {'POST'}
+        )
+        post_adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=post_retry)
+        session.mount('https://google.serper.dev/', post_adapter)
+        if self.webhook_url:
+            webhook = urlsplit(self.webhook_url)
+            session.mount(f'{webhook.scheme}://{webhook.netloc}/', post_adapter)
+        return session
+    
+    def _load_price_history(self):
+        """Load lowest prices and last alerts saved by a previous run"""
+        try:
+            with open(self.history_path) as f:
+                history = json.load(f)
+            if not isinstance(history, dict) or not all(
+                isinstance(entry, dict)
+                and isinstance(entry.get('lowest'), (int, float))
+                and isinstance(entry.get('last_alert'), str)
+                for entry in history.values()
+            ):
+                logger.warning("Ignoring price history with unexpected format: %s", self.history_path)
+                return {}
+            # Files written before zero prices were rejected may hold a 0
+            # baseline; forget it rather than carry it forward
+            for entry in history.values():
+                if entry['lowest'] <= 0:
+                    entry['lowest'] = math.inf
+            logger.info("Loaded price history for %d products", len(history))
+            return history
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable price history: %s", e)
+            return {}
+    
+    def _save_price_history(self):
+        """Atomically write price history so restarts keep alert baselines"""
+        tmp_path = self.history_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.price_history, f)
+            os.replace(tmp_path, self.history_path)
+            self._history_dirty = False
+        except OSError as e:
+            logger.error("Error saving price history: %s", e)
         
-    def get_csv_export_url(self, sheet_url):
-        """Convert Google Sheet URL to CSV export URL"""
-        match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', sheet_url)
+    @staticmethod
+    @functools.lru_cache(maxsize=4)
+    def get_csv_export_url(sheet_url):
+        """Convert Google Sheet URL to CSV export URL (memoized per URL)"""
+        match = _SHEET_ID_RE.search(sheet_url)
         if not match:
             raise ValueError("Invalid Google Sheet URL")
         
         sheet_id = match.group(1)
-        gid_match = re.search(r'[#&]gid=([0-9]+)', sheet_url)
+        gid_match = _GID_RE.search(sheet_url)
         gid = gid_match.group(1) if gid_match else '0'
         
         return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
@@ -62,95 +299,140 @@ class PriceMonitor:
         """Read products from Google Sheet CSV export"""
         try:
             csv_url = self.get_csv_export_url(self.sheet_url)
-            response = requests.get(csv_url, timeout=10)
+            
+            # Conditional GET so an unchanged sheet is not re-downloaded
+            headers = {}
+            if self._sheet_cache['etag']:
+                headers['If-None-Match'] = self._sheet_cache['etag']
+            if self._sheet_cache['last_modified']:
+                headers['If-Modified-Since'] = self._sheet_cache['last_modified']
+            
+            response = self.session.get(csv_url, headers=headers, timeout=10)
+            cached = self._sheet_cache['products']
+            if response.status_code == 304 and cached is not None:
+                products = self._apply_price_history(cached)
+                logger.info("Sheet unchanged, reusing %d active products", len(products))
+                _update_status(products_monitored=len(products))
+                return products
+            
             response.raise_for_status()
             
-            csv_data = StringIO(response.text)
-            reader = csv.DictReader(csv_data)
+            # The CSV export often omits validators, so also skip the parse
+            # when the body is byte-for-byte the one parsed last time
+            digest = hashlib.blake2b(response.content, digest_size=16).digest()
+            if cached is not None and digest == self._sheet_cache['digest']:
+                products = cached
+                logger.debug("Sheet content unchanged, skipping parse")
+            else:
+                csv_data = StringIO(response.content.decode('utf-8'), newline='')
+                products = self._parse_products(csv.reader(csv_data))
             
-            products = []
-            for row in reader:
-                active_value = str(row.get('Active', '')).strip().upper()
-                if active_value not in ['TRUE', 'YES', '1', 'Y']:
-                    continue
-                
-                try:
-                    product = {
-                        'name': row.get('Product Name', '').strip(),
-                        'search_query': row.get('Search Query', '').strip(),
-                        'specifications': row.get('Specifications', '').strip(),
-                        'price_min': float(row.get('Target Price Min', 0) or 0),
-                        'price_max': float(row.get('Target Price Max', 999999) or 999999),
-                        'drop_threshold': float(row.get('Drop Alert %', 25) or 25),
-                    }
-                    
-                    if not product['name']:
-                        continue
-                    
-                    # Build full search query
-                    query = product['search_query'] or product['name']
-                    if product['specifications']:
-                        query += ' ' + product['specifications']
-                    product['full_query'] = query
-                    
-                    product_key = product['name'].lower()
-                    if product_key in self.price_history:
-                        product['lowest_price'] = self.price_history[product_key]['lowest']
-                        product['last_alert_type'] = self.price_history[product_key]['last_alert']
-                    else:
-                        product['lowest_price'] = 999999
-                        product['last_alert_type'] = ''
-                    
-                    products.append(product)
-                    
-                except (ValueError, TypeError) as e:
-                    print(f"Skipping invalid row: {e}")
-                    continue
+            self._sheet_cache = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'digest': digest,
+                'products': products
+            }
+            products = self._apply_price_history(products)
             
-            print(f"Loaded {len(products)} active products from sheet")
-            monitor_status['products_monitored'] = len(products)
+            logger.info("Loaded %d active products from sheet", len(products))
+            _update_status(products_monitored=len(products))
             return products
             
         except Exception as e:
             error_msg = f"Failed to read Google Sheet: {str(e)}"
             self.send_error_alert(error_msg)
-            monitor_status['last_error'] = error_msg
-            print(f"Error reading sheet: {e}")
+            _update_status(last_error=error_msg)
+            logger.error("Error reading sheet: %s", e)
+            
+            if self._sheet_cache['products'] is not None:
+                logger.warning("Falling back to last known product list")
+                return self._apply_price_history(self._sheet_cache['products'])
             return []
     
+    def _parse_products(self, reader):
+        """Build Product rows from the active lines of the sheet CSV"""
+        # Resolve column positions once from the header row
+        columns = {name.strip(): i for i, name in enumerate(next(reader, []))}
+        i_active = columns.get('Active')
+        i_name = columns.get('Product Name')
+        i_query = columns.get('Search Query')
+        i_specs = columns.get('Specifications')
+        i_min = columns.get('Target Price Min')
+        i_max = columns.get('Target Price Max')
+        i_drop = columns.get('Drop Alert %')
+        
+        products = []
+        for row in reader:
+            active_value = _cell(row, i_active).upper()
+            if active_value not in _ACTIVE_VALUES:
+                continue
+            
+            try:
+                name = _cell(row, i_name)
+                if not name:
+                    continue
+                
+                product = Product(
+                    name=name,
+                    search_query=_cell(row, i_query),
+                    specifications=_cell(row, i_specs),
+                    price_min=_float_or(_cell(row, i_min), 0.0),
+                    price_max=_float_or(_cell(row, i_max), math.inf),
+                    drop_threshold=_float_or(_cell(row, i_drop), 25.0),
+                )
+                
+                products.append(product)
+                
+            except (ValueError, TypeError) as e:
+                logger.warning("Skipping invalid row: %s", e)
+                continue
+        
+        return products
+    
+    def _apply_price_history(self, products):
+        """Return copies of products with their stored lowest price and last alert"""
+        bound = []
+        for product in products:
+            history = self.price_history.get(product.key)
+            if history:
+                product = replace(product, lowest_price=history['lowest'],
+                                  last_alert_type=history['last_alert'])
+            else:
+                product = replace(product)
+            bound.append(product)
+        return bound
+    
     def search_google_shopping_serper(self, product):
         """Search Google Shopping using Serper.dev API"""
         try:
             if not self.serper_key:
                 raise ValueError("SERPER_API_KEY not set")
             
-            headers = {
-                'X-API-KEY': self.serper_key,
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
-                'q': product['full_query'],
+                'q': product.full_query,
                 'gl': 'uk',
                 'hl': 'en',
                 'location': 'London, England, United Kingdom',
-                'num': 20
+                'num': 10
             }
             
-            print(f"  Searching: {product['full_query']}")
+            logger.debug("  Searching: %s", product.full_query)
             
-            response = requests.post(
+            self.serper_limiter.acquire()
+            response = self.session.post(
                 'https://google.serper.dev/shopping',
-                headers=headers,
+                headers=self._serper_headers,
                 json=payload,
                 timeout=15
             )
             response.raise_for_status()
             
             data = response.json()
-            monitor_status['api_calls_used'] += 1
+            _increment_status('api_calls_used')
             
             results = []
+            seen_offers = set()
             shopping_results = data.get('shopping', [])
             
             for item in shopping_results:
@@ -159,16 +441,20 @@ class PriceMonitor:
                     if not price_str:
                         continue
                     
-                    price_match = re.search(r'([\d,]+\.?\d*)', price_str)
-                    if not price_match:
+                    price = _parse_price(price_str)
+                    if price is None:
                         continue
                     
-                    price = float(price_match.group(1).replace(',', ''))
                     retailer = item.get('source', 'Unknown')
-                    retailer_lower = retailer.lower()
                     
-                    if any(excluded in retailer_lower for excluded in EXCLUDED_RETAILERS):
+                    if _EXCLUDED_RE.search(retailer):
+                        continue
+                    
+                    # Google often lists the same offer more than once
+                    offer = (retailer.lower(), round(price, 2))
+                    if offer in seen_offers:
                         continue
+                    seen_offers.add(offer)
                     
                     link = item.get('link', '')
                     
@@ -176,42 +462,37 @@ class PriceMonitor:
                         'retailer': retailer,
                         'price': price,
                         'link': link,
-                        'title': item.get('title', product['name'])
+                        'title': item.get('title', product.name)
                     })
                     
                 except Exception:
                     continue
             
             if results:
-                print(f"  Found {len(results)} products")
-                monitor_status['last_results'] = [
-                    f"£{r['price']:.2f} - {r['retailer']}" 
-                    for r in sorted(results, key=lambda x: x['price'])[:5]
-                ]
+                logger.debug("  Found %d products", len(results))
             else:
-                print(f"  No results found")
-                monitor_status['last_results'] = ["No results"]
+                logger.info("  No results found: %s", product.full_query)
+                _update_status(last_results=("No results",))
             
             return results
             
         except Exception as e:
             error_msg = f"API error: {str(e)}"
-            print(f"  {error_msg}")
-            monitor_status['last_results'] = [error_msg]
+            logger.warning("  %s", error_msg)
+            _update_status(last_results=(error_msg,))
             return []
     
-    def check_price_alerts(self, product, current_results):
-        """Check if price meets alert criteria"""
-        if not current_results:
+    def check_price_alerts(self, product, lowest_result):
+        """Check if the lowest current result meets alert criteria"""
+        if lowest_result is None:
             return None
         
-        lowest_result = min(current_results, key=lambda x: x['price'])
         current_price = lowest_result['price']
         
         alerts = []
         
-        in_range = product['price_min'] <= current_price <= product['price_max']
-        if in_range and product['last_alert_type'] != 'range':
+        in_range = product.price_min <= current_price <= product.price_max
+        if in_range and product.last_alert_type != 'range':
             alerts.append({
                 'type': 'range',
                 'current_price': current_price,
@@ -219,82 +500,94 @@ class PriceMonitor:
                 'message': f"Price in target range: £{current_price:.2f}"
             })
         
-        if product['lowest_price'] < 999999:
-            drop_percentage = ((product['lowest_price'] - current_price) / product['lowest_price']) * 100
+        if math.isfinite(product.lowest_price) and product.lowest_price > 0:
+            drop_percentage = ((product.lowest_price - current_price) / product.lowest_price) * 100
             
-            if drop_percentage >= product['drop_threshold'] and product['last_alert_type'] != 'drop':
+            if drop_percentage >= product.drop_threshold and product.last_alert_type != 'drop':
                 alerts.append({
                     'type': 'drop',
                     'current_price': current_price,
                     'result': lowest_result,
-                    'previous_lowest': product['lowest_price'],
+                    'previous_lowest': product.lowest_price,
                     'drop_percentage': drop_percentage,
                     'message': f"Price dropped {drop_percentage:.1f}%"
                 })
         
-        product_key = product['name'].lower()
-        if product_key not in self.price_history:
-            self.price_history[product_key] = {
-                'lowest': current_price,
-                'last_alert': ''
-            }
-        else:
-            if current_price < self.price_history[product_key]['lowest']:
-                self.price_history[product_key]['lowest'] = current_price
+        history = self.price_history.setdefault(product.key, {'lowest': math.inf, 'last_alert': ''})
+        if current_price < history['lowest']:
+            history['lowest'] = current_price
+            self._history_dirty = True
         
         if alerts:
-            self.price_history[product_key]['last_alert'] = alerts[0]['type']
+            history['last_alert'] = alerts[0]['type']
+            self._history_dirty = True
         
         return alerts if alerts else None
     
-    def send_discord_alert(self, product, alerts):
-        """Send price alert to Discord"""
-        try:
-            for alert in alerts:
-                embed = {
-                    "title": f"Price Alert: {product['name']}",
-                    "color": 0x00ff00 if alert['type'] == 'range' else 0xff9900,
-                    "fields": [
-                        {
-                            "name": "Current Price",
-                            "value": f"£{alert['current_price']:.2f}",
-                            "inline": True
-                        },
-                        {
-                            "name": "Retailer",
-                            "value": alert['result']['retailer'],
-                            "inline": True
-                        }
-                    ],
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
-                if alert['type'] == 'drop':
-                    embed['fields'].insert(1, {
-                        "name": "Previous Lowest",
-                        "value": f"£{alert['previous_lowest']:.2f}",
-                        "inline": True
-                    })
-                elif alert['type'] == 'range':
-                    embed['fields'].append({
-                        "name": "Target Range",
-                        "value": f"£{product['price_min']}-£{product['price_max']}",
-                        "inline": True
-                    })
-                
-                if alert['result']['link']:
-                    embed['url'] = alert['result']['link']
-                
-                payload = {"embeds": [embed]}
+    def build_alert_embed(self, product, alert, timestamp):
+        """Build the Discord embed for a single price alert"""
+        embed = _EMBED_BASE.copy()
+        embed["title"] = f"Price Alert: {product.name}"
+        embed["color"] = _ALERT_COLORS[alert['type']]
+        embed["fields"] = [
+            {
+                "name": "Current Price",
+                "value": f"£{alert['current_price']:.2f}",
+                "inline": True
+            },
+            {
+                "name": "Retailer",
+                "value": alert['result']['retailer'],
+                "inline": True
+            }
+        ]
+        embed["timestamp"] = timestamp
+        
+        if alert['type'] == 'drop':
+            embed['fields'].insert(1, {
+                "name": "Previous Lowest",
+                "value": f"£{alert['previous_lowest']:.2f}",
+                "inline": True
+            })
+        elif alert['type'] == 'range':
+            if math.isinf(product.price_max):
+                target_range = f"£{product.price_min}+"
+            else:
+                target_range = f"£{product.price_min}-£{product.price_max}"
+            embed['fields'].append({
+                "name": "Target Range",
+                "value": target_range,
+                "inline": True
+            })
+        
+        if alert['result']['link']:
+            embed['url'] = alert['result']['link']
+        
+        return embed
+    
+    def send_discord_alert(self, pending_alerts, timestamp):
+        """Send (product, alert) pairs to Discord, batching embeds per message"""
+        embeds = [
+            self.build_alert_embed(product, alert, timestamp)
+            for product, alert in pending_alerts
+        ]
+        
+        for start in range(0, len(embeds), DISCORD_MAX_EMBEDS):
+            batch = embeds[start:start + DISCORD_MAX_EMBEDS]
+            try:
+                payload = {"username": DISCORD_USERNAME, "embeds": batch}
                 
-                response = requests.post(self.webhook_url, json=payload, timeout=10)
+                response = self.session.post(self.webhook_url, json=payload, timeout=10)
                 response.raise_for_status()
-                print(f"  Alert sent")
-                monitor_status['alerts_sent'] += 1
-                time.sleep(1)
+                logger.info("  Sent %d alert(s)", len(batch))
+                _increment_status('alerts_sent', len(batch))
                 
-        except Exception as e:
-            print(f"  Error sending alert: {e}")
+                # Only wait when Discord says the webhook bucket is empty
+                if response.headers.get('X-RateLimit-Remaining') == '0':
+                    time.sleep(float(response.headers.get('X-RateLimit-Reset-After') or 0))
+                
+            except Exception as e:
+                logger.error("  Error sending alerts: %s", e)
     
     def send_error_alert(self, error_message):
         """Send error notification to Discord"""
@@ -306,90 +599,132 @@ class PriceMonitor:
                 "timestamp": datetime.utcnow().isoformat()
             }
             payload = {"embeds": [embed]}
-            requests.post(self.webhook_url, json=payload, timeout=10)
-        except:
-            pass
+            self.session.post(self.webhook_url, json=payload, timeout=10)
+        except Exception as e:
+            logger.error("Error sending error alert: %s", e)
     
     def run_check(self):
         """Run a single check cycle"""
-        print(f"\n{'='*60}")
-        print(f"Price check at {datetime.now().strftime('%H:%M:%S GMT')}")
-        print(f"{'='*60}")
+        # One clock read per cycle for logs, status and alert embeds
+        cycle_time = datetime.now()
+        cycle_utc = datetime.utcnow().isoformat()
+        
+        logger.info("=" * 60)
+        logger.info("Price check at %s", cycle_time.strftime('%H:%M:%S GMT'))
+        logger.info("=" * 60)
         
-        monitor_status['last_check'] = datetime.now().isoformat()
-        monitor_status['total_checks'] += 1
+        _update_status(last_check=cycle_time.isoformat())
+        _increment_status('total_checks')
         
         products = self.read_google_sheet()
         
         if not products:
-            print("No active products")
+            logger.info("No active products")
             return
         
-        for i, product in enumerate(products, 1):
-            try:
-                print(f"\n[{i}/{len(products)}] {product['name']}")
-                
-                results = self.search_google_shopping_serper(product)
-                
-                if results:
-                    alerts = self.check_price_alerts(product, results)
+        pending_alerts = []
+        
+        # Serper searches are independent I/O, so fan them out and handle
+        # the results back on this thread in sheet order. Rows sharing a
+        # query reuse the same pending search instead of a second API call.
+        with ThreadPoolExecutor(max_workers=SERPER_CONCURRENCY) as executor:
+            searches = {}
+            futures = []
+            for product in products:
+                query = product.full_query
+                if query not in searches:
+                    searches[query] = executor.submit(self.search_google_shopping_serper, product)
+                futures.append(searches[query])
+            
+            for i, (product, future) in enumerate(zip(products, futures), 1):
+                try:
+                    logger.info("[%d/%d] %s", i, len(products), product.name)
                     
-                    lowest_result = min(results, key=lambda x: x['price'])
-                    print(f"  Best: £{lowest_result['price']:.2f} at {lowest_result['retailer']}")
+                    results = future.result()
                     
-                    if alerts:
-                        print(f"  ALERT TRIGGERED")
-                        self.send_discord_alert(product, alerts)
-                    else:
-                        print(f"  No alerts")
-                
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"  Error: {e}")
-                continue
+                    if results:
+                        top_results = heapq.nsmallest(5, results, key=_price_key)
+                        lowest_result = top_results[0]
+                        # Published as a tuple so the shallow dashboard snapshot
+                        # can never see a list being changed
+                        _update_status(last_results=tuple(
+                            f"£{r['price']:.2f} - {r['retailer']}" for r in top_results
+                        ))
+                        alerts = self.check_price_alerts(product, lowest_result)
+                        
+                        logger.info("  Best: £%.2f at %s", lowest_result['price'], lowest_result['retailer'])
+                        
+                        if alerts:
+                            logger.info("  ALERT TRIGGERED")
+                            pending_alerts.extend((product, alert) for alert in alerts)
+                        else:
+                            logger.info("  No alerts")
+                    
+                except Exception as e:
+                    logger.error("  Error: %s", e)
+                    continue
+        
+        if pending_alerts:
+            logger.info("Sending %d alert(s) to Discord", len(pending_alerts))
+            self.send_discord_alert(pending_alerts, cycle_utc)
         
-        print(f"\nCheck complete. API calls used: {monitor_status['api_calls_used']}")
-        monitor_status['next_check'] = datetime.fromtimestamp(time.time() + CHECK_INTERVAL).isoformat()
+        if self._history_dirty:
+            self._save_price_history()
+        
+        logger.info("Check complete. API calls used: %d", monitor_status['api_calls_used'])
+    
+    def close(self):
+        """Mark the monitor stopped and release pooled connections"""
+        logger.info("Stopping...")
+        _update_status(running=False)
+        self.session.close()
     
     def run(self):
         """Main monitoring loop"""
-        print("=" * 60)
-        print("GOOGLE SHOPPING MONITOR (Serper.dev)")
-        print("=" * 60)
-        print(f"Check interval: {CHECK_INTERVAL/60:.0f} minutes")
-        print(f"Discord: {'OK' if self.webhook_url else 'NOT SET'}")
-        print(f"Sheet: {'OK' if self.sheet_url else 'NOT SET'}")
-        print(f"Serper: {'OK' if self.serper_key else 'NOT SET - Get key at serper.dev'}")
-        print("=" * 60)
+        logger.info("=" * 60)
+        logger.info("GOOGLE SHOPPING MONITOR (Serper.dev)")
+        logger.info("=" * 60)
+        logger.info("Check interval: %.0f minutes", CHECK_INTERVAL / 60)
+        logger.info("Discord: %s", 'OK' if self.webhook_url else 'NOT SET')
+        logger.info("Sheet: %s", 'OK' if self.sheet_url else 'NOT SET')
+        logger.info("Serper: %s", 'OK' if self.serper_key else 'NOT SET - Get key at serper.dev')
+        logger.info("=" * 60)
         
         if not self.webhook_url or not self.sheet_url:
-            print("\nERROR: Missing configuration!")
+            logger.error("ERROR: Missing configuration!")
             return
         
         if not self.serper_key:
-            print("\nERROR: SERPER_API_KEY not set!")
-            print("Get free key at: https://serper.dev")
+            logger.error("ERROR: SERPER_API_KEY not set!")
+            logger.error("Get free key at: https://serper.dev")
             return
         
-        monitor_status['running'] = True
+        _update_status(running=True)
+        
+        logger.info("Running first check...")
         
-        print("\nRunning first check...")
-        self.run_check()
+        # Schedule against a monotonic deadline so the time a cycle takes
+        # does not push every later check back
+        deadline = time.monotonic()
         
         while True:
             try:
-                time.sleep(CHECK_INTERVAL)
+                deadline += CHECK_INTERVAL
                 self.run_check()
-            except KeyboardInterrupt:
-                print("\nStopping...")
-                monitor_status['running'] = False
-                break
+                
+                now = time.monotonic()
+                if deadline < now:
+                    # The cycle overran the interval; start the next one now
+                    deadline = now
+                delay = deadline - now
+                _update_status(next_check=datetime.fromtimestamp(time.time() + delay).isoformat())
+                time.sleep(delay)
             except Exception as e:
                 error_msg = f"Error: {e}"
-                print(f"\n{error_msg}")
-                monitor_status['last_error'] = error_msg
+                logger.error("%s", error_msg)
+                _update_status(last_error=error_msg)
                 time.sleep(60)
+                deadline = time.monotonic()
 
 # Flask app
 app = Flask(__name__)
@@ -461,20 +796,45 @@ HTML = """
 </html>
 """
 
+# Compile the dashboard once instead of on every request
+_DASHBOARD_TEMPLATE = app.jinja_env.from_string(HTML)
+_HEALTH_RESPONSE = (b'{"status": "ok"}', 200, {'Content-Type': 'application/json'})
+
 @app.route('/')
 def dashboard():
-    return render_template_string(HTML, status=monitor_status)
+    return _DASHBOARD_TEMPLATE.render(status=_status_snapshot())
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'ok'})
+    return _HEALTH_RESPONSE
 
-def run_monitor():
-    monitor = PriceMonitor()
-    monitor.run()
+def _handle_sigterm(signum, frame):
+    # docker stop sends SIGTERM; exit through the same path as Ctrl+C
+    raise SystemExit(0)
 
 if __name__ == "__main__":
-    monitor_thread = Thread(target=run_monitor, daemon=True)
-    monitor_thread.start()
-    print(f"\nStarting dashboard on port {PORT}...")
-    app.run(host='0.0.0.0', port=PORT)
+    # Search and request threads only enqueue records; one listener
+    # thread formats them and writes to stderr
+    log_queue = Queue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    log_listener = QueueListener(log_queue, stream_handler)
+    queue_handler = QueueHandler(log_queue)
+    # The listener's handler applies the full format; keep records bare here
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=LOG_LEVEL, handlers=[queue_handler])
+    log_listener.start()
+    
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    
+    # The monitor thread is a daemon, so shutdown is driven from here once
+    # serve() returns on SIGINT/SIGTERM
+    monitor = PriceMonitor()
+    try:
+        monitor_thread = Thread(target=monitor.run, daemon=True)
+        monitor_thread.start()
+        logger.info("Starting dashboard on port %d...", PORT)
+        serve(app, host='0.0.0.0', port=PORT, threads=4)
+    finally:
+        monitor.close()
+        log_listener.stop()